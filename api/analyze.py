@@ -1,15 +1,26 @@
 from fastapi import FastAPI, File, UploadFile, Form, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse, FileResponse
+from fastapi.responses import JSONResponse, StreamingResponse
 import porespy
 import numpy as np
 import matplotlib.pyplot as plt
 import skimage.io
+import skimage.color
+import skimage.exposure
+import skimage.util
 import os
+import asyncio
+import functools
+import inspect
+import threading
 import tempfile
 import zipfile
+import hashlib
+import shutil
+import time
+from collections import OrderedDict
 from datetime import datetime
-from skimage.filters import threshold_otsu
+from types import SimpleNamespace
 from PIL import Image
 import io
 import json
@@ -31,8 +42,10 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Store analysis results temporarily
-analysis_results = {}
+# Store analysis results temporarily (expired entries and their temp dirs are removed)
+RESULTS_TTL_SEC = 3600
+RESULTS_MAX_ENTRIES = 128
+analysis_results = OrderedDict()  # output_dir -> (analysis dir, creation time)
 
 # Pixel-size lookup table
 PIXEL_DATA = {
@@ -41,6 +54,132 @@ PIXEL_DATA = {
     (554, 416): {200: 174/200},
 }
 
+# pyplot keeps global figure state, so serialize plotting across worker threads
+PLOT_LOCK = threading.Lock()
+
+# Decoded images / Otsu levels and pore size maps of recent uploads, keyed by content hash
+ANALYSIS_CACHE_SIZE = 4
+image_cache = OrderedDict()  # digest -> (img, otsu_level)
+thickness_cache = OrderedDict()  # (digest, thresh_mag, max_rad_px) -> im_thick
+cache_lock = threading.Lock()
+
+def cache_get(cache, key):
+    """Return a cached value and mark it as recently used (None on miss)"""
+    with cache_lock:
+        value = cache.get(key)
+        if value is not None:
+            cache.move_to_end(key)
+        return value
+
+def cache_put(cache, key, value):
+    """Store a value, evicting the least recently used entries beyond ANALYSIS_CACHE_SIZE"""
+    with cache_lock:
+        cache[key] = value
+        cache.move_to_end(key)
+        while len(cache) > ANALYSIS_CACHE_SIZE:
+            cache.popitem(last=False)
+
+def hash_upload(img_file):
+    """Content hash of an uploaded file, read in chunks and rewound afterwards"""
+    digest = hashlib.blake2b(digest_size=16)
+    img_file.seek(0)
+    for chunk in iter(lambda: img_file.read(1 << 20), b""):
+        digest.update(chunk)
+    img_file.seek(0)
+    return digest.hexdigest()
+
+def prune_analysis_results():
+    """Drop results older than RESULTS_TTL_SEC or beyond RESULTS_MAX_ENTRIES and return their temp dirs"""
+    now = time.monotonic()
+    stale = []
+    while analysis_results:
+        key, (out_dir, created_at) = next(iter(analysis_results.items()))
+        if len(analysis_results) <= RESULTS_MAX_ENTRIES and now - created_at < RESULTS_TTL_SEC:
+            break
+        del analysis_results[key]
+        stale.append(os.path.dirname(out_dir))
+    return stale
+
+def remember_analysis_result(key, out_dir):
+    """Register out_dir for download under key and return the temp dirs that are no longer needed"""
+    stale = []
+    previous = analysis_results.pop(key, None)
+    if previous is not None and previous[0] != out_dir:
+        stale.append(os.path.dirname(previous[0]))
+    analysis_results[key] = (out_dir, time.monotonic())
+    return stale + prune_analysis_results()
+
+def lookup_analysis_result(key):
+    """Return the analysis dir registered under key, or None if unknown or expired"""
+    entry = analysis_results.get(key)
+    return entry[0] if entry is not None else None
+
+async def remove_temp_dirs(dirs):
+    """Delete temp dirs in a worker thread so the event loop is not blocked by disk I/O"""
+    def remove():
+        for temp_dir in dirs:
+            shutil.rmtree(temp_dir, ignore_errors=True)
+    
+    if dirs:
+        await asyncio.get_running_loop().run_in_executor(None, remove)
+
+def decode_image(img_file):
+    """Decode an upload to a uint8 grayscale array, rescaled by its dtype range (BT.709 luma like rgb2gray)"""
+    with Image.open(img_file) as im:
+        if im.mode not in ("1", "L", "LA", "RGB", "RGBA", "I", "F") and not im.mode.startswith("I;16"):
+            im = im.convert("RGBA" if im.mode.endswith("A") else "RGB")  # palette, CMYK, YCbCr, ...
+        mode = im.mode
+        img = np.asarray(im)
+    if mode == "I":  # 16-bit PNGs decode as int32
+        img = np.clip(img, 0, 65535).astype(np.uint16)
+    elif mode == "F":
+        img = skimage.exposure.rescale_intensity(img, out_range=(0.0, 1.0))
+    if img.ndim == 3:
+        if img.shape[-1] == 2:  # LA
+            img = img[..., 0]
+        else:
+            if img.shape[-1] == 4:
+                img = skimage.color.rgba2rgb(img)
+            img = skimage.color.rgb2gray(img)
+    return skimage.util.img_as_ubyte(img)
+
+def compute_otsu_threshold(img):
+    """Otsu threshold of a uint8 image from a 256-bin np.bincount histogram"""
+    hist = np.bincount(img.ravel(), minlength=256).astype(np.float64)
+    p = hist / hist.sum()
+    omega = np.cumsum(p)
+    mu = np.cumsum(p * np.arange(256))
+    sigma_b2 = (mu[-1] * omega - mu) ** 2 / (omega * (1 - omega) + 1e-12)
+    return float(np.argmax(sigma_b2))
+
+# Distance-transform local thickness (porespy 2.x defaults to the slower FFT-based 'hybrid' mode)
+LOCAL_THICKNESS_DT = (
+    {"method": "dt"} if "method" in inspect.signature(porespy.filters.local_thickness).parameters
+    else {"mode": "dt"}
+)
+
+def compute_pore_size_map(mask_pore, radii_px):
+    """Local thickness: each pore pixel gets the radius (px) of the largest disk from radii_px covering it"""
+    return porespy.filters.local_thickness(mask_pore, sizes=radii_px, **LOCAL_THICKNESS_DT).astype(np.float32)
+
+def compute_pore_size_distribution(im_thick, max_rad_px, nm_per_px, bins=100):
+    """Histogram the pore size map into radius bins (nm) with a single np.bincount pass"""
+    # ceil(r / (max_rad_px / bins)) in integer arithmetic, so exact multiples stay in their bin
+    idx = (im_thick.ravel().astype(np.int64) * bins + max_rad_px - 1) // max_rad_px
+    idx = np.minimum(idx, bins)
+    counts = np.bincount(idx, minlength=bins + 1)[1:]  # 0 = background
+    total = counts.sum()
+    if total == 0:
+        empty = np.empty(0)
+        return SimpleNamespace(bin_centers=empty, bin_widths=empty, pdf=empty)
+
+    bin_width_nm = max_rad_px / bins * nm_per_px
+    return SimpleNamespace(
+        bin_centers=(np.arange(bins) + 0.5) * bin_width_nm,
+        bin_widths=np.full(bins, bin_width_nm),
+        pdf=counts / (total * bin_width_nm),
+    )
+
 @app.get("/api/health")
 async def health_check():
     return {"status": "healthy", "message": "Poromet API is running"}
@@ -60,6 +199,15 @@ async def analyze_pore_size(
         if not file.filename:
             raise HTTPException(status_code=400, detail="No file provided")
         
+        # Check the upload size; the image is decoded straight from the upload stream
+        file.file.seek(0, os.SEEK_END)
+        file_size = file.file.tell()
+        file.file.seek(0)
+        if file_size == 0:
+            raise HTTPException(status_code=400, detail="Empty file provided")
+        
+        logger.info(f"Received uploaded file: {file.filename} ({file_size} bytes)")
+        
         # Create temporary directory for this analysis
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
         temp_dir = tempfile.mkdtemp()
@@ -68,119 +216,19 @@ async def analyze_pore_size(
         
         logger.info(f"Created output directory: {out_dir}")
         
-        # Save uploaded file
-        file_content = await file.read()
-        if len(file_content) == 0:
-            raise HTTPException(status_code=400, detail="Empty file provided")
-            
-        img_path = os.path.join(temp_dir, file.filename)
-        with open(img_path, "wb") as f:
-            f.write(file_content)
-        
-        logger.info(f"Saved uploaded file: {img_path} ({len(file_content)} bytes)")
-        
-        # Load and process image
+        # Run the CPU-bound analysis off the event loop
         try:
-            img = skimage.io.imread(img_path, as_gray=True)
-            h, w = img.shape[:2]
-            logger.info(f"Image loaded successfully: {w}x{h}")
-        except Exception as e:
-            logger.error(f"Failed to load image: {e}")
-            raise HTTPException(status_code=400, detail=f"Failed to load image: {str(e)}")
-        
-        # Get pixel size
-        try:
-            px_per_nm = PIXEL_DATA[(w, h)][magnification]
-        except KeyError:
-            available_resolutions = list(PIXEL_DATA.keys())
-            available_mags = {res: list(PIXEL_DATA[res].keys()) for res in available_resolutions}
-            error_msg = f"Unknown resolution ({w}×{h}) or magnification ({magnification}×). Available combinations: {available_mags}"
-            logger.error(error_msg)
-            raise HTTPException(status_code=400, detail=error_msg)
-        
-        nm_per_px = 1 / px_per_nm
-        logger.info(f"Pixel size: {nm_per_px:.4f} nm/px")
-        
-        # Analysis parameters
-        max_rad_px = int((max_diam_nm/2) * px_per_nm)
-        if max_rad_px < 1:
-            raise HTTPException(status_code=400, detail="Maximum diameter too small for this magnification")
-            
-        radii_px = list(range(1, max_rad_px+1))
-        logger.info(f"Analysis range: 1 to {max_rad_px} pixels ({len(radii_px)} sizes)")
-        
-        # Segmentation
-        try:
-            th = threshold_otsu(img) * thresh_mag
-            mask_pore = img < th
-            pore_fraction = np.mean(mask_pore)
-            logger.info(f"Threshold: {th:.3f}, Pore fraction: {pore_fraction:.3f}")
-            
-            if pore_fraction < 0.001:
-                logger.warning("Very low pore fraction detected - check threshold settings")
-            elif pore_fraction > 0.9:
-                logger.warning("Very high pore fraction detected - check threshold settings")
-                
-        except Exception as e:
-            logger.error(f"Segmentation failed: {e}")
-            raise HTTPException(status_code=500, detail=f"Image segmentation failed: {str(e)}")
-        
-        # Porosimetry & PSD
-        try:
-            logger.info("Running porosimetry analysis...")
-            im_thick = porespy.filters.porosimetry(mask_pore, sizes=radii_px)
-            
-            logger.info("Calculating pore size distribution...")
-            psd = porespy.metrics.pore_size_distribution(
-                im_thick, log=False, bins=100, voxel_size=nm_per_px
+            result = await asyncio.get_running_loop().run_in_executor(
+                None, functools.partial(run_analysis, file.file, out_dir, magnification, max_diam_nm, thresh_mag)
             )
-            
-            if len(psd.bin_centers) == 0:
-                raise HTTPException(status_code=500, detail="No pores detected in the analysis")
-                
-        except Exception as e:
-            logger.error(f"Pore analysis failed: {e}")
-            raise HTTPException(status_code=500, detail=f"Pore size analysis failed: {str(e)}")
-        
-        # Statistics
-        avg_rad_nm = np.average(psd.bin_centers, weights=psd.pdf)
-        avg_diam_nm = 2 * avg_rad_nm
-        mode_rad_nm = psd.bin_centers[np.argmax(psd.pdf)]
-        mode_diam_nm = 2 * mode_rad_nm
-        
-        # Convert to diameter
-        diam_center_nm = psd.bin_centers * 2
-        diam_width_nm = psd.bin_widths * 2
-        diam_pdf = psd.pdf / 2
-        
-        logger.info(f"Results: avg={avg_diam_nm:.2f}nm, mode={mode_diam_nm:.2f}nm")
-        
-        # Save results
-        try:
-            save_analysis_results(out_dir, img, mask_pore, im_thick, 
-                                diam_center_nm, diam_width_nm, diam_pdf,
-                                avg_diam_nm, mode_diam_nm, nm_per_px, 
-                                w, h, magnification)
-        except Exception as e:
-            logger.error(f"Failed to save results: {e}")
-            # Continue anyway, we have the main results
+        except Exception:
+            # Failed analyses are never registered, so nothing else would remove the dir
+            await remove_temp_dirs([temp_dir])
+            raise
         
         # Store results for download
-        analysis_results[timestamp] = out_dir
-        
-        # Prepare response
-        histogram_data = [
-            {"diameter": float(d), "pdf": float(p)} 
-            for d, p in zip(diam_center_nm, diam_pdf)
-        ]
-        
-        result = {
-            "avg_diam_nm": float(avg_diam_nm),
-            "mode_diam_nm": float(mode_diam_nm),
-            "histogram_data": histogram_data,
-            "output_dir": timestamp,
-            "pixel_size": float(nm_per_px)
-        }
+        await remove_temp_dirs(remember_analysis_result(timestamp, out_dir))
+        result["output_dir"] = timestamp
         
         logger.info("Analysis completed successfully")
         return JSONResponse(result)
@@ -192,6 +240,148 @@ async def analyze_pore_size(
         logger.error(traceback.format_exc())
         raise HTTPException(status_code=500, detail=f"Analysis failed: {str(e)}")
 
+def run_analysis(img_file, out_dir, magnification, max_diam_nm, thresh_mag):
+    """Run segmentation and pore sizing for one image (blocking, runs in a worker thread)"""
+    # Load and process image (reused when the same image is analysed again)
+    image_key = hash_upload(img_file)
+    cached = cache_get(image_cache, image_key)
+    if cached is not None:
+        img, otsu_level = cached
+        h, w = img.shape[:2]
+        logger.info(f"Using cached image: {w}x{h}")
+    else:
+        try:
+            img = decode_image(img_file)
+            h, w = img.shape[:2]
+            logger.info(f"Image loaded successfully: {w}x{h}")
+        except Exception as e:
+            logger.error(f"Failed to load image: {e}")
+            raise HTTPException(status_code=400, detail=f"Failed to load image: {str(e)}")
+        img.setflags(write=False)
+        otsu_level = compute_otsu_threshold(img)
+        cache_put(image_cache, image_key, (img, otsu_level))
+    
+    # Get pixel size
+    try:
+        px_per_nm = PIXEL_DATA[(w, h)][magnification]
+    except KeyError:
+        available_resolutions = list(PIXEL_DATA.keys())
+        available_mags = {res: list(PIXEL_DATA[res].keys()) for res in available_resolutions}
+        error_msg = f"Unknown resolution ({w}×{h}) or magnification ({magnification}×). Available combinations: {available_mags}"
+        logger.error(error_msg)
+        raise HTTPException(status_code=400, detail=error_msg)
+    
+    nm_per_px = 1 / px_per_nm
+    logger.info(f"Pixel size: {nm_per_px:.4f} nm/px")
+    
+    # Analysis parameters
+    max_rad_px = int((max_diam_nm/2) * px_per_nm)
+    if max_rad_px < 1:
+        raise HTTPException(status_code=400, detail="Maximum diameter too small for this magnification")
+    
+    radii_px = list(range(1, max_rad_px+1))
+    logger.info(f"Analysis range: 1 to {max_rad_px} pixels ({len(radii_px)} sizes)")
+    
+    # Segmentation
+    try:
+        th = otsu_level * thresh_mag
+        mask_pore = np.ascontiguousarray(img < th)
+        pore_fraction = np.mean(mask_pore)
+        logger.info(f"Threshold: {th:.1f}, Pore fraction: {pore_fraction:.3f}")
+    
+        if pore_fraction < 0.001:
+            logger.warning("Very low pore fraction detected - check threshold settings")
+        elif pore_fraction > 0.9:
+            logger.warning("Very high pore fraction detected - check threshold settings")
+    
+    except Exception as e:
+        logger.error(f"Segmentation failed: {e}")
+        raise HTTPException(status_code=500, detail=f"Image segmentation failed: {str(e)}")
+    
+    # Porosimetry & PSD
+    try:
+        logger.info("Running porosimetry analysis...")
+        thickness_key = (image_key, thresh_mag, max_rad_px)
+        im_thick = cache_get(thickness_cache, thickness_key)
+        if im_thick is None:
+            im_thick = compute_pore_size_map(mask_pore, radii_px)
+            im_thick.setflags(write=False)
+            cache_put(thickness_cache, thickness_key, im_thick)
+    
+        logger.info("Calculating pore size distribution...")
+        psd = compute_pore_size_distribution(im_thick, max_rad_px, nm_per_px, bins=100)
+    
+        if len(psd.bin_centers) == 0:
+            raise HTTPException(status_code=500, detail="No pores detected in the analysis")
+    
+    except Exception as e:
+        logger.error(f"Pore analysis failed: {e}")
+        raise HTTPException(status_code=500, detail=f"Pore size analysis failed: {str(e)}")
+    
+    # Statistics
+    avg_rad_nm = np.average(psd.bin_centers, weights=psd.pdf)
+    avg_diam_nm = 2 * avg_rad_nm
+    mode_rad_nm = psd.bin_centers[np.argmax(psd.pdf)]
+    mode_diam_nm = 2 * mode_rad_nm
+    
+    # Convert to diameter
+    diam_center_nm = psd.bin_centers * 2
+    diam_width_nm = psd.bin_widths * 2
+    diam_pdf = psd.pdf / 2
+    
+    logger.info(f"Results: avg={avg_diam_nm:.2f}nm, mode={mode_diam_nm:.2f}nm")
+    
+    # Save results (report files are rendered on first download)
+    try:
+        save_analysis_state(
+            out_dir,
+            dict(img=img, mask_pore=mask_pore, im_thick=im_thick.astype(np.uint16),  # whole-pixel radii
+                 diam_center_nm=diam_center_nm, diam_width_nm=diam_width_nm, diam_pdf=diam_pdf),
+            dict(avg_diam_nm=float(avg_diam_nm), mode_diam_nm=float(mode_diam_nm),
+                 nm_per_px=float(nm_per_px), w=int(w), h=int(h), magnification=int(magnification))
+        )
+    except Exception as e:
+        logger.error(f"Failed to save results: {e}")
+        # Continue anyway, we have the main results
+    
+    # Prepare response
+    histogram_data = {
+        "diameter": diam_center_nm.tolist(),
+        "pdf": diam_pdf.tolist()
+    }
+    
+    result = {
+        "avg_diam_nm": float(avg_diam_nm),
+        "mode_diam_nm": float(mode_diam_nm),
+        "histogram_data": histogram_data,
+        "pixel_size": float(nm_per_px)
+    }
+    
+    return result
+
+def save_analysis_state(out_dir, arrays, stats):
+    """Persist the arrays and statistics needed to render the report files for out_dir"""
+    state_dir = os.path.dirname(out_dir)
+    np.savez(os.path.join(state_dir, "results.npz"), **arrays)
+    with open(os.path.join(state_dir, "stats.json"), "w", encoding="utf-8") as f:
+        json.dump(stats, f)
+
+def render_analysis_results(out_dir):
+    """Render the report files for out_dir from its saved state (only once)"""
+    state_dir = os.path.dirname(out_dir)
+    npz_path = os.path.join(state_dir, "results.npz")
+    stats_path = os.path.join(state_dir, "stats.json")
+    with PLOT_LOCK:
+        if not os.path.exists(npz_path):
+            return
+        with np.load(npz_path) as data:
+            arrays = {key: data[key] for key in data.files}
+        with open(stats_path, encoding="utf-8") as f:
+            stats = json.load(f)
+        save_analysis_results(out_dir, **arrays, **stats)
+        os.remove(npz_path)
+        os.remove(stats_path)
+
 def save_analysis_results(out_dir, img, mask_pore, im_thick, 
                          diam_center_nm, diam_width_nm, diam_pdf,
                          avg_diam_nm, mode_diam_nm, nm_per_px, 
@@ -207,8 +397,8 @@ def save_analysis_results(out_dir, img, mask_pore, im_thick,
         f.write(f"Average Diameter : {avg_diam_nm:.3f} nm\n")
         f.write(f"Mode    Diameter : {mode_diam_nm:.3f} nm\n\n")
         f.write("Diameter_center(nm)\tBin_width(nm)\tPDF_diameter\n")
-        for c, w_, p in zip(diam_center_nm, diam_width_nm, diam_pdf):
-            f.write(f"{c:.3f}\t{w_:.3f}\t{p:.6f}\n")
+        np.savetxt(f, np.column_stack([diam_center_nm, diam_width_nm, diam_pdf]),
+                   fmt=['%.3f', '%.3f', '%.6f'], delimiter='\t')
     
     # Histogram plot
     plt.figure(figsize=(10, 6))
@@ -226,8 +416,8 @@ def save_analysis_results(out_dir, img, mask_pore, im_thick,
     raw_path = os.path.join(out_dir, "raw_histogram_data.txt")
     with open(raw_path, "w") as f:
         f.write("Diameter_center(nm)\tPDF_diameter\n")
-        for c, p in zip(diam_center_nm, diam_pdf):
-            f.write(f"{c:.3f}\t{p:.6f}\n")
+        np.savetxt(f, np.column_stack([diam_center_nm, diam_pdf]),
+                   fmt=['%.3f', '%.6f'], delimiter='\t')
         mean_diam_nm = np.average(diam_center_nm, weights=diam_pdf)
         f.write(f"\nWeighted Mean Diameter: {mean_diam_nm:.3f} nm\n")
     
@@ -237,31 +427,37 @@ def save_analysis_results(out_dir, img, mask_pore, im_thick,
     plt.imsave(os.path.join(out_dir, "filtered_image_colormap.png"),
                im_thick, cmap="viridis")
 
+def iter_results_zip(analysis_dir, chunk_size=1 << 16):
+    """Build an uncompressed zip of analysis_dir in memory and yield it in chunks"""
+    buffered = io.BytesIO()
+    with zipfile.ZipFile(buffered, 'w', zipfile.ZIP_STORED) as zipf:
+        for root, dirs, files in os.walk(analysis_dir):
+            for file in files:
+                file_path = os.path.join(root, file)
+                zipf.write(file_path, os.path.relpath(file_path, analysis_dir))
+    buffered.seek(0)
+    yield from iter(lambda: buffered.read(chunk_size), b"")
+
 @app.get("/api/download/{output_dir}")
 async def download_results(output_dir: str):
     """Create and return a zip file with all results"""
     try:
-        if output_dir not in analysis_results:
+        await remove_temp_dirs(prune_analysis_results())
+        analysis_dir = lookup_analysis_result(output_dir)
+        if analysis_dir is None:
             raise HTTPException(status_code=404, detail="Results not found")
         
-        analysis_dir = analysis_results[output_dir]
-        
         if not os.path.exists(analysis_dir):
             raise HTTPException(status_code=404, detail="Results directory not found")
         
-        # Create zip file
-        zip_path = os.path.join(os.path.dirname(analysis_dir), f"poromet_results_{output_dir}.zip")
-        with zipfile.ZipFile(zip_path, 'w') as zipf:
-            for root, dirs, files in os.walk(analysis_dir):
-                for file in files:
-                    file_path = os.path.join(root, file)
-                    arcname = os.path.relpath(file_path, analysis_dir)
-                    zipf.write(file_path, arcname)
+        # Render report files on first download
+        await asyncio.get_running_loop().run_in_executor(None, render_analysis_results, analysis_dir)
         
-        return FileResponse(
-            zip_path,
+        # Stream the zip from memory; PNGs are already compressed, so store without deflate
+        return StreamingResponse(
+            iter_results_zip(analysis_dir),
             media_type="application/zip",
-            filename=f"poromet_results_{output_dir}.zip"
+            headers={"Content-Disposition": f'attachment; filename="poromet_results_{output_dir}.zip"'}
         )
         
     except HTTPException:
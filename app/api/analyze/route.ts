@@ -7,20 +7,22 @@ async function mockPoreAnalysis(imageBuffer: Buffer, magnification: number, maxD
 
   // Generate realistic mock data based on parameters
   const baseSize = 20 + (magnification / 100) * 10
-  const histogram_data = []
+  const histogram_data: { diameter: number[]; pdf: number[] } = { diameter: [], pdf: [] }
 
   for (let i = 0; i < 80; i++) {
     const diameter = 5 + i * (maxDiamNm / 80)
     const pdf =
       Math.exp(-Math.pow((diameter - baseSize) / (baseSize * 0.4), 2)) * (0.6 + Math.random() * 0.8) * threshMag
-    histogram_data.push({ diameter, pdf })
+    histogram_data.diameter.push(diameter)
+    histogram_data.pdf.push(pdf)
   }
 
   // Calculate statistics
-  const totalPdf = histogram_data.reduce((sum, d) => sum + d.pdf, 0)
-  const avgDiam = histogram_data.reduce((sum, d) => sum + d.diameter * d.pdf, 0) / totalPdf
-  const maxPdfIndex = histogram_data.reduce((maxIdx, d, idx, arr) => (d.pdf > arr[maxIdx].pdf ? idx : maxIdx), 0)
-  const modeDiam = histogram_data[maxPdfIndex].diameter
+  const { diameter, pdf } = histogram_data
+  const totalPdf = pdf.reduce((sum, p) => sum + p, 0)
+  const avgDiam = diameter.reduce((sum, d, idx) => sum + d * pdf[idx], 0) / totalPdf
+  const maxPdfIndex = pdf.reduce((maxIdx, p, idx, arr) => (p > arr[maxIdx] ? idx : maxIdx), 0)
+  const modeDiam = diameter[maxPdfIndex]
 
   return {
     avg_diam_nm: avgDiam,
@@ -20,7 +20,7 @@ interface AnalysisParams {
 interface AnalysisResult {
   avg_diam_nm: number
   mode_diam_nm: number
-  histogram_data: Array<{ diameter: number; pdf: number }>
+  histogram_data: { diameter: number[]; pdf: number[] }
   output_dir: string
   pixel_size: number
   pore_fraction: number
@@ -434,11 +434,11 @@ export default function PorometApp() {
 
                       <div className="text-sm text-gray-600 grid grid-cols-2 gap-4">
                         <div>
-                          <p>データポイント数: {(result.histogram_data || []).length}</p>
+                          <p>データポイント数: {(result.histogram_data?.diameter || []).length}</p>
                           <p>
                             範囲:{" "}
-                            {result.histogram_data && result.histogram_data.length > 0
-                              ? `${Math.min(...result.histogram_data.map((d) => d.diameter)).toFixed(1)} - ${Math.max(...result.histogram_data.map((d) => d.diameter)).toFixed(1)} nm`
+                            {result.histogram_data?.diameter && result.histogram_data.diameter.length > 0
+                              ? `${Math.min(...result.histogram_data.diameter).toFixed(1)} - ${Math.max(...result.histogram_data.diameter).toFixed(1)} nm`
                               : "データなし"}
                           </p>
                         </div>
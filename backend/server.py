@@ -1,10 +1,19 @@
 import os
 import sys
+import asyncio
+import functools
+import inspect
+import threading
 import tempfile
 import zipfile
 import traceback
 import logging
+import hashlib
+import shutil
+import time
+from collections import OrderedDict
 from datetime import datetime
+from types import SimpleNamespace
 from typing import Optional
 
 # Auto-install missing dependencies
@@ -38,8 +47,9 @@ def install_missing_dependencies():
             except subprocess.CalledProcessError:
                 print(f"❌ Failed to install {package}")
 
-# Install dependencies first
-install_missing_dependencies()
+# Install dependencies first (opt-in: spawning pip on every import slows worker start-up)
+if os.environ.get('POROMET_AUTO_INSTALL') == '1':
+    install_missing_dependencies()
 
 # Now import the required modules
 import numpy as np
@@ -48,7 +58,11 @@ matplotlib.use('Agg')  # Use non-interactive backend
 import matplotlib.pyplot as plt
 import matplotlib.colors as mcolors
 import skimage.io
-from skimage.filters import threshold_otsu
+import skimage.color
+import skimage.exposure
+import skimage.util
+from scipy.ndimage import label
+import porespy
 from PIL import Image
 import base64
 from io import BytesIO
@@ -57,27 +71,9 @@ import json
 
 from fastapi import FastAPI, File, UploadFile, Form, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse, FileResponse
+from fastapi.responses import JSONResponse, StreamingResponse
 import uvicorn
 
-# Try to import porespy
-try:
-    import porespy
-    PORESPY_AVAILABLE = True
-    print("✅ porespy imported successfully")
-except ImportError as e:
-    PORESPY_AVAILABLE = False
-    print(f"⚠️ porespy not available: {e}")
-    print("Installing porespy...")
-    import subprocess
-    try:
-        subprocess.check_call([sys.executable, "-m", "pip", "install", "porespy"])
-        import porespy
-        PORESPY_AVAILABLE = True
-        print("✅ porespy installed and imported successfully")
-    except:
-        print("❌ Failed to install porespy")
-
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -97,8 +93,10 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Store analysis results temporarily
-analysis_results = {}
+# Store analysis results temporarily (expired entries and their temp dirs are removed)
+RESULTS_TTL_SEC = 3600
+RESULTS_MAX_ENTRIES = 128
+analysis_results = OrderedDict()  # output_dir -> (analysis dir, creation time)
 
 # Pixel-size lookup table (手入力データ)
 PIXEL_DATA = {
@@ -107,13 +105,142 @@ PIXEL_DATA = {
     (554, 416): {200: 174/200},
 }
 
+# pyplot keeps global figure state, so serialize plotting across worker threads
+PLOT_LOCK = threading.Lock()
+
+# Plot style and colormap are set up once per process instead of per request
+plt.rcParams['font.family'] = ['DejaVu Sans', 'Arial Unicode MS', 'sans-serif']
+VIRIDIS_LUT = (plt.cm.viridis(np.linspace(0, 1, 256))[:, :3] * 255).astype(np.uint8)
+
+# Decoded images / Otsu levels and pore size maps of recent uploads, keyed by content hash
+ANALYSIS_CACHE_SIZE = 4
+image_cache = OrderedDict()  # digest -> (img, otsu_level)
+thickness_cache = OrderedDict()  # (digest, thresh_mag, max_rad_px) -> im_thick
+cache_lock = threading.Lock()
+
+def cache_get(cache, key):
+    """Return a cached value and mark it as recently used (None on miss)"""
+    with cache_lock:
+        value = cache.get(key)
+        if value is not None:
+            cache.move_to_end(key)
+        return value
+
+def cache_put(cache, key, value):
+    """Store a value, evicting the least recently used entries beyond ANALYSIS_CACHE_SIZE"""
+    with cache_lock:
+        cache[key] = value
+        cache.move_to_end(key)
+        while len(cache) > ANALYSIS_CACHE_SIZE:
+            cache.popitem(last=False)
+
+def hash_upload(img_file):
+    """Content hash of an uploaded file, read in chunks and rewound afterwards"""
+    digest = hashlib.blake2b(digest_size=16)
+    img_file.seek(0)
+    for chunk in iter(lambda: img_file.read(1 << 20), b""):
+        digest.update(chunk)
+    img_file.seek(0)
+    return digest.hexdigest()
+
+def prune_analysis_results():
+    """Drop results older than RESULTS_TTL_SEC or beyond RESULTS_MAX_ENTRIES and return their temp dirs"""
+    now = time.monotonic()
+    stale = []
+    while analysis_results:
+        key, (out_dir, created_at) = next(iter(analysis_results.items()))
+        if len(analysis_results) <= RESULTS_MAX_ENTRIES and now - created_at < RESULTS_TTL_SEC:
+            break
+        del analysis_results[key]
+        stale.append(os.path.dirname(out_dir))
+    return stale
+
+def remember_analysis_result(key, out_dir):
+    """Register out_dir for download under key and return the temp dirs that are no longer needed"""
+    stale = []
+    previous = analysis_results.pop(key, None)
+    if previous is not None and previous[0] != out_dir:
+        stale.append(os.path.dirname(previous[0]))
+    analysis_results[key] = (out_dir, time.monotonic())
+    return stale + prune_analysis_results()
+
+def lookup_analysis_result(key):
+    """Return the analysis dir registered under key, or None if unknown or expired"""
+    entry = analysis_results.get(key)
+    return entry[0] if entry is not None else None
+
+async def remove_temp_dirs(dirs):
+    """Delete temp dirs in a worker thread so the event loop is not blocked by disk I/O"""
+    def remove():
+        for temp_dir in dirs:
+            shutil.rmtree(temp_dir, ignore_errors=True)
+    
+    if dirs:
+        await asyncio.get_running_loop().run_in_executor(None, remove)
+
+def decode_image(img_file):
+    """Decode an upload to a uint8 grayscale array, rescaled by its dtype range (BT.709 luma like rgb2gray)"""
+    with Image.open(img_file) as im:
+        if im.mode not in ("1", "L", "LA", "RGB", "RGBA", "I", "F") and not im.mode.startswith("I;16"):
+            im = im.convert("RGBA" if im.mode.endswith("A") else "RGB")  # palette, CMYK, YCbCr, ...
+        mode = im.mode
+        img = np.asarray(im)
+    if mode == "I":  # 16-bit PNGs decode as int32
+        img = np.clip(img, 0, 65535).astype(np.uint16)
+    elif mode == "F":
+        img = skimage.exposure.rescale_intensity(img, out_range=(0.0, 1.0))
+    if img.ndim == 3:
+        if img.shape[-1] == 2:  # LA
+            img = img[..., 0]
+        else:
+            if img.shape[-1] == 4:
+                img = skimage.color.rgba2rgb(img)
+            img = skimage.color.rgb2gray(img)
+    return skimage.util.img_as_ubyte(img)
+
+def compute_otsu_threshold(img):
+    """Otsu threshold of a uint8 image from a 256-bin np.bincount histogram"""
+    hist = np.bincount(img.ravel(), minlength=256).astype(np.float64)
+    p = hist / hist.sum()
+    omega = np.cumsum(p)
+    mu = np.cumsum(p * np.arange(256))
+    sigma_b2 = (mu[-1] * omega - mu) ** 2 / (omega * (1 - omega) + 1e-12)
+    return float(np.argmax(sigma_b2))
+
+# Distance-transform local thickness (porespy 2.x defaults to the slower FFT-based 'hybrid' mode)
+LOCAL_THICKNESS_DT = (
+    {"method": "dt"} if "method" in inspect.signature(porespy.filters.local_thickness).parameters
+    else {"mode": "dt"}
+)
+
+def compute_pore_size_map(mask_pore, radii_px):
+    """Local thickness: each pore pixel gets the radius (px) of the largest disk from radii_px covering it"""
+    return porespy.filters.local_thickness(mask_pore, sizes=radii_px, **LOCAL_THICKNESS_DT).astype(np.float32)
+
+def compute_pore_size_distribution(im_thick, max_rad_px, nm_per_px, bins=100):
+    """Histogram the pore size map into radius bins (nm) with a single np.bincount pass"""
+    # ceil(r / (max_rad_px / bins)) in integer arithmetic, so exact multiples stay in their bin
+    idx = (im_thick.ravel().astype(np.int64) * bins + max_rad_px - 1) // max_rad_px
+    idx = np.minimum(idx, bins)
+    counts = np.bincount(idx, minlength=bins + 1)[1:]  # 0 = background
+    total = counts.sum()
+    if total == 0:
+        empty = np.empty(0)
+        return SimpleNamespace(bin_centers=empty, bin_widths=empty, pdf=empty)
+
+    bin_width_nm = max_rad_px / bins * nm_per_px
+    return SimpleNamespace(
+        bin_centers=(np.arange(bins) + 0.5) * bin_width_nm,
+        bin_widths=np.full(bins, bin_width_nm),
+        pdf=counts / (total * bin_width_nm),
+    )
+
 @app.get("/")
 async def root():
     return {
         "message": "Poromet API is running",
         "status": "healthy",
-        "version": "1.0.0",
-        "porespy_available": PORESPY_AVAILABLE
+        "version": "1.0.0"
     }
 
 @app.get("/api/health")
@@ -121,8 +248,7 @@ async def health_check():
     return {
         "status": "healthy", 
         "message": "Poromet API is running",
-        "timestamp": datetime.now().isoformat(),
-        "porespy_available": PORESPY_AVAILABLE
+        "timestamp": datetime.now().isoformat()
     }
 
 @app.post("/api/analyze")
@@ -132,12 +258,6 @@ async def analyze_pore_size(
     max_diam_nm: float = Form(...),
     thresh_mag: float = Form(...)
 ):
-    if not PORESPY_AVAILABLE:
-        raise HTTPException(
-            status_code=500,
-            detail="porespy is not available. Please install it: pip install porespy"
-        )
-    
     try:
         logger.info(f"解析リクエスト受信: mag={magnification}, max_diam={max_diam_nm}, thresh={thresh_mag}")
         logger.info(f"ファイル: {file.filename}, content_type: {file.content_type}")
@@ -146,6 +266,15 @@ async def analyze_pore_size(
         if not file.filename:
             raise HTTPException(status_code=400, detail="ファイルが提供されていません")
         
+        # Check the upload size; the image is decoded straight from the upload stream
+        file.file.seek(0, os.SEEK_END)
+        file_size = file.file.tell()
+        file.file.seek(0)
+        if file_size == 0:
+            raise HTTPException(status_code=400, detail="空のファイルが提供されました")
+        
+        logger.info(f"アップロードファイル受信: {file.filename} ({file_size} bytes)")
+        
         # Create temporary directory for this analysis
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
         temp_dir = tempfile.mkdtemp()
@@ -154,163 +283,19 @@ async def analyze_pore_size(
         
         logger.info(f"出力ディレクトリ作成: {out_dir}")
         
-        # Save uploaded file
-        file_content = await file.read()
-        if len(file_content) == 0:
-            raise HTTPException(status_code=400, detail="空のファイルが提供されました")
-            
-        img_path = os.path.join(temp_dir, file.filename)
-        with open(img_path, "wb") as f:
-            f.write(file_content)
-        
-        logger.info(f"アップロードファイル保存: {img_path} ({len(file_content)} bytes)")
-        
-        # Load and process image
-        try:
-            img = skimage.io.imread(img_path, as_gray=True)
-            h, w = img.shape[:2]
-            logger.info(f"画像読み込み成功: {w}x{h}")
-        except Exception as e:
-            logger.error(f"画像読み込み失敗: {e}")
-            raise HTTPException(status_code=400, detail=f"画像の読み込みに失敗しました: {str(e)}")
-        
-        # Get pixel size
-        try:
-            px_per_nm = PIXEL_DATA[(w, h)][magnification]
-        except KeyError:
-            available_resolutions = list(PIXEL_DATA.keys())
-            available_mags = {res: list(PIXEL_DATA[res].keys()) for res in available_resolutions}
-            error_msg = f"未知の解像度 ({w}×{h}) または倍率 ({magnification}×)。利用可能な組み合わせ: {available_mags}"
-            logger.error(error_msg)
-            raise HTTPException(status_code=400, detail=error_msg)
-        
-        nm_per_px = 1 / px_per_nm
-        logger.info(f"ピクセルサイズ: {nm_per_px:.4f} nm/px")
-        
-        # Analysis parameters
-        max_rad_px = int((max_diam_nm/2) * px_per_nm)
-        if max_rad_px < 1:
-            raise HTTPException(status_code=400, detail="この倍率では最大直径が小さすぎます")
-            
-        radii_px = list(range(1, max_rad_px+1))
-        logger.info(f"解析範囲: 1 から {max_rad_px} ピクセル ({len(radii_px)} サイズ)")
-        
-        # Segmentation
+        # Run the CPU-bound analysis off the event loop
         try:
-            th = threshold_otsu(img) * thresh_mag
-            mask_pore = img < th
-            pore_fraction = np.mean(mask_pore)
-            logger.info(f"閾値: {th:.3f}, 細孔率: {pore_fraction:.3f}")
-            
-            if pore_fraction < 0.001:
-                logger.warning("非常に低い細孔率が検出されました - 閾値設定を確認してください")
-            elif pore_fraction > 0.9:
-                logger.warning("非常に高い細孔率が検出されました - 閾値設定を確認してください")
-                
-        except Exception as e:
-            logger.error(f"セグメンテーション失敗: {e}")
-            raise HTTPException(status_code=500, detail=f"画像セグメンテーションに失敗しました: {str(e)}")
-        
-        # Porosimetry & PSD - 実際の細孔解析
-        try:
-            logger.info("細孔解析を実行中...")
-            im_thick = porespy.filters.porosimetry(mask_pore, sizes=radii_px)
-            
-            logger.info("細孔サイズ分布を計算中...")
-            psd = porespy.metrics.pore_size_distribution(
-                im_thick, log=False, bins=100, voxel_size=nm_per_px
-            )
-            
-            if len(psd.bin_centers) == 0:
-                raise HTTPException(status_code=500, detail="解析で細孔が検出されませんでした")
-                
-        except Exception as e:
-            logger.error(f"細孔解析失敗: {e}")
-            raise HTTPException(status_code=500, detail=f"細孔サイズ解析に失敗しました: {str(e)}")
-        
-        # Statistics - 実際の統計計算
-        avg_rad_nm = np.average(psd.bin_centers, weights=psd.pdf)
-        avg_diam_nm = 2 * avg_rad_nm
-        mode_rad_nm = psd.bin_centers[np.argmax(psd.pdf)]
-        mode_diam_nm = 2 * mode_rad_nm
-        
-        # Convert to diameter
-        diam_center_nm = psd.bin_centers * 2
-        diam_width_nm = psd.bin_widths * 2
-        diam_pdf = psd.pdf / 2
-        
-        # Count total pores (approximate)
-        total_pores = int(np.sum(mask_pore) / (np.pi * (avg_rad_nm * px_per_nm)**2)) if avg_rad_nm > 0 else 0
-        
-        logger.info(f"解析結果: avg={avg_diam_nm:.2f}nm, mode={mode_diam_nm:.2f}nm, pores={total_pores}")
-        
-        # Save results
-        try:
-            save_analysis_results(
-                out_dir, img, mask_pore, im_thick, 
-                diam_center_nm, diam_width_nm, diam_pdf,
-                avg_diam_nm, mode_diam_nm, nm_per_px, 
-                w, h, magnification, pore_fraction, total_pores
+            result = await asyncio.get_running_loop().run_in_executor(
+                None, functools.partial(run_analysis, file.file, out_dir, magnification, max_diam_nm, thresh_mag)
             )
-        except Exception as e:
-            logger.error(f"結果保存失敗: {e}")
-            # Continue anyway, we have the main results
+        except Exception:
+            # Failed analyses are never registered, so nothing else would remove the dir
+            await remove_temp_dirs([temp_dir])
+            raise
         
         # Store results for download
-        analysis_results[timestamp] = out_dir
-        
-        # 画像をbase64エンコードするヘルパー関数
-        def image_to_base64(img, cmap='gray'):
-            buffered = BytesIO()
-            plt.figure(figsize=(8, 6))
-            plt.imshow(img, cmap=cmap)
-            plt.axis('off')
-            plt.tight_layout()
-            plt.savefig(buffered, format='png', bbox_inches='tight', pad_inches=0, dpi=100)
-            plt.close()
-            return base64.b64encode(buffered.getvalue()).decode('utf-8')
-
-        # ヒストグラムを生成してbase64エンコード
-        def create_histogram():
-            plt.figure(figsize=(10, 6))
-            plt.bar(diam_center_nm, diam_pdf, width=diam_width_nm, 
-                   edgecolor="k", alpha=0.7, color='steelblue')
-            plt.axvline(avg_diam_nm, color='r', linestyle='--', label=f'平均: {avg_diam_nm:.1f}nm')
-            plt.axvline(mode_diam_nm, color='g', linestyle='--', label=f'最頻: {mode_diam_nm:.1f}nm')
-            plt.xlabel("細孔直径 (nm)", fontsize=12)
-            plt.ylabel("確率密度", fontsize=12)
-            plt.title("細孔サイズ分布", fontsize=14)
-            plt.legend()
-            plt.grid(True, alpha=0.3)
-            plt.tight_layout()
-            buffered = BytesIO()
-            plt.savefig(buffered, format='png', dpi=100, bbox_inches='tight')
-            plt.close()
-            return base64.b64encode(buffered.getvalue()).decode('utf-8')
-
-        # 画像を生成
-        filtered_image = image_to_base64(mask_pore, 'gray')
-        pore_map = image_to_base64(im_thick, 'viridis')
-        histogram = create_histogram()
-
-        # レスポンスデータを準備
-        histogram_data = [
-            {"diameter": float(d), "pdf": float(p)} 
-            for d, p in zip(diam_center_nm, diam_pdf)
-        ]
-        
-        result = {
-            "avg_diam_nm": float(avg_diam_nm),
-            "mode_diam_nm": float(mode_diam_nm),
-            "histogram_data": histogram_data,
-            "output_dir": timestamp,
-            "pixel_size": float(nm_per_px),
-            "pore_fraction": float(pore_fraction),
-            "total_pores": int(total_pores),
-            "filtered_image": filtered_image,
-            "pore_map": pore_map,
-            "histogram": histogram
-        }
+        await remove_temp_dirs(remember_analysis_result(timestamp, out_dir))
+        result["output_dir"] = timestamp
         
         logger.info("解析が正常に完了しました")
         return JSONResponse(result)
@@ -322,6 +307,192 @@ async def analyze_pore_size(
         logger.error(traceback.format_exc())
         raise HTTPException(status_code=500, detail=f"解析に失敗しました: {str(e)}")
 
+def run_analysis(img_file, out_dir, magnification, max_diam_nm, thresh_mag):
+    """Run segmentation, pore sizing and rendering for one image (blocking, runs in a worker thread)"""
+    # Load and process image (reused when the same image is analysed again)
+    image_key = hash_upload(img_file)
+    cached = cache_get(image_cache, image_key)
+    if cached is not None:
+        img, otsu_level = cached
+        h, w = img.shape[:2]
+        logger.info(f"キャッシュ済み画像を使用: {w}x{h}")
+    else:
+        try:
+            img = decode_image(img_file)
+            h, w = img.shape[:2]
+            logger.info(f"画像読み込み成功: {w}x{h}")
+        except Exception as e:
+            logger.error(f"画像読み込み失敗: {e}")
+            raise HTTPException(status_code=400, detail=f"画像の読み込みに失敗しました: {str(e)}")
+        img.setflags(write=False)
+        otsu_level = compute_otsu_threshold(img)
+        cache_put(image_cache, image_key, (img, otsu_level))
+    
+    # Get pixel size
+    try:
+        px_per_nm = PIXEL_DATA[(w, h)][magnification]
+    except KeyError:
+        available_resolutions = list(PIXEL_DATA.keys())
+        available_mags = {res: list(PIXEL_DATA[res].keys()) for res in available_resolutions}
+        error_msg = f"未知の解像度 ({w}×{h}) または倍率 ({magnification}×)。利用可能な組み合わせ: {available_mags}"
+        logger.error(error_msg)
+        raise HTTPException(status_code=400, detail=error_msg)
+    
+    nm_per_px = 1 / px_per_nm
+    logger.info(f"ピクセルサイズ: {nm_per_px:.4f} nm/px")
+    
+    # Analysis parameters
+    max_rad_px = int((max_diam_nm/2) * px_per_nm)
+    if max_rad_px < 1:
+        raise HTTPException(status_code=400, detail="この倍率では最大直径が小さすぎます")
+    
+    radii_px = list(range(1, max_rad_px+1))
+    logger.info(f"解析範囲: 1 から {max_rad_px} ピクセル ({len(radii_px)} サイズ)")
+    
+    # Segmentation
+    try:
+        th = otsu_level * thresh_mag
+        mask_pore = np.ascontiguousarray(img < th)
+        pore_fraction = np.count_nonzero(mask_pore) / mask_pore.size
+        logger.info(f"閾値: {th:.1f}, 細孔率: {pore_fraction:.3f}")
+    
+        if pore_fraction < 0.001:
+            logger.warning("非常に低い細孔率が検出されました - 閾値設定を確認してください")
+        elif pore_fraction > 0.9:
+            logger.warning("非常に高い細孔率が検出されました - 閾値設定を確認してください")
+    
+    except Exception as e:
+        logger.error(f"セグメンテーション失敗: {e}")
+        raise HTTPException(status_code=500, detail=f"画像セグメンテーションに失敗しました: {str(e)}")
+    
+    # Porosimetry & PSD - 実際の細孔解析
+    try:
+        logger.info("細孔解析を実行中...")
+        thickness_key = (image_key, thresh_mag, max_rad_px)
+        im_thick = cache_get(thickness_cache, thickness_key)
+        if im_thick is None:
+            im_thick = compute_pore_size_map(mask_pore, radii_px)
+            im_thick.setflags(write=False)
+            cache_put(thickness_cache, thickness_key, im_thick)
+    
+        logger.info("細孔サイズ分布を計算中...")
+        psd = compute_pore_size_distribution(im_thick, max_rad_px, nm_per_px, bins=100)
+    
+        if len(psd.bin_centers) == 0:
+            raise HTTPException(status_code=500, detail="解析で細孔が検出されませんでした")
+    
+    except Exception as e:
+        logger.error(f"細孔解析失敗: {e}")
+        raise HTTPException(status_code=500, detail=f"細孔サイズ解析に失敗しました: {str(e)}")
+    
+    # Statistics - 実際の統計計算
+    avg_rad_nm = np.average(psd.bin_centers, weights=psd.pdf)
+    avg_diam_nm = 2 * avg_rad_nm
+    mode_rad_nm = psd.bin_centers[np.argmax(psd.pdf)]
+    mode_diam_nm = 2 * mode_rad_nm
+    
+    # Convert to diameter
+    diam_center_nm = psd.bin_centers * 2
+    diam_width_nm = psd.bin_widths * 2
+    diam_pdf = psd.pdf / 2
+    
+    # Count total pores (connected pore regions)
+    _, total_pores = label(mask_pore, output=np.int32)
+    
+    logger.info(f"解析結果: avg={avg_diam_nm:.2f}nm, mode={mode_diam_nm:.2f}nm, pores={total_pores}")
+    
+    # Save results (report files are rendered on first download)
+    try:
+        save_analysis_state(
+            out_dir,
+            dict(img=img, mask_pore=mask_pore, im_thick=im_thick.astype(np.uint16),  # whole-pixel radii
+                 diam_center_nm=diam_center_nm, diam_width_nm=diam_width_nm, diam_pdf=diam_pdf),
+            dict(avg_diam_nm=float(avg_diam_nm), mode_diam_nm=float(mode_diam_nm),
+                 nm_per_px=float(nm_per_px), w=int(w), h=int(h), magnification=int(magnification),
+                 pore_fraction=float(pore_fraction), total_pores=int(total_pores))
+        )
+    except Exception as e:
+        logger.error(f"結果保存失敗: {e}")
+        # Continue anyway, we have the main results
+    
+    # ヒストグラムを生成してbase64エンコード
+    def create_histogram():
+        plt.figure(figsize=(10, 6))
+        plt.bar(diam_center_nm, diam_pdf, width=diam_width_nm, 
+               edgecolor="k", alpha=0.7, color='steelblue')
+        plt.axvline(avg_diam_nm, color='r', linestyle='--', label=f'平均: {avg_diam_nm:.1f}nm')
+        plt.axvline(mode_diam_nm, color='g', linestyle='--', label=f'最頻: {mode_diam_nm:.1f}nm')
+        plt.xlabel("細孔直径 (nm)", fontsize=12)
+        plt.ylabel("確率密度", fontsize=12)
+        plt.title("細孔サイズ分布", fontsize=14)
+        plt.legend()
+        plt.grid(True, alpha=0.3)
+        buffered = BytesIO()
+        plt.savefig(buffered, format='png', dpi=100, bbox_inches='tight')
+        plt.close()
+        return base64.b64encode(buffered.getvalue()).decode('utf-8')
+    
+    # 画像を生成 (二値化画像と細孔マップは PIL で直接 PNG エンコード)
+    filtered_image = encode_png_base64(mask_pore.astype(np.uint8) * 255)
+    pore_map = encode_png_base64(colorize_pore_map(im_thick))
+    with PLOT_LOCK:
+        histogram = create_histogram()
+    
+    # レスポンスデータを準備
+    histogram_data = {
+        "diameter": diam_center_nm.tolist(),
+        "pdf": diam_pdf.tolist()
+    }
+    
+    result = {
+        "avg_diam_nm": float(avg_diam_nm),
+        "mode_diam_nm": float(mode_diam_nm),
+        "histogram_data": histogram_data,
+        "pixel_size": float(nm_per_px),
+        "pore_fraction": float(pore_fraction),
+        "total_pores": int(total_pores),
+        "filtered_image": filtered_image,
+        "pore_map": pore_map,
+        "histogram": histogram
+    }
+    
+    return result
+
+def encode_png_base64(arr):
+    """Encode a uint8 grayscale or RGB array as a base64 PNG string"""
+    buffered = BytesIO()
+    Image.fromarray(arr).save(buffered, format='PNG', optimize=False)
+    return base64.b64encode(buffered.getvalue()).decode('utf-8')
+
+def colorize_pore_map(im_thick):
+    """Map the pore size map onto viridis as a uint8 RGB array"""
+    peak = im_thick.max()
+    idx = (im_thick * (255 / peak)).astype(np.uint8) if peak > 0 else np.zeros(im_thick.shape, np.uint8)
+    return VIRIDIS_LUT[idx]
+
+def save_analysis_state(out_dir, arrays, stats):
+    """Persist the arrays and statistics needed to render the report files for out_dir"""
+    state_dir = os.path.dirname(out_dir)
+    np.savez(os.path.join(state_dir, "results.npz"), **arrays)
+    with open(os.path.join(state_dir, "stats.json"), "w", encoding="utf-8") as f:
+        json.dump(stats, f)
+
+def render_analysis_results(out_dir):
+    """Render the report files for out_dir from its saved state (only once)"""
+    state_dir = os.path.dirname(out_dir)
+    npz_path = os.path.join(state_dir, "results.npz")
+    stats_path = os.path.join(state_dir, "stats.json")
+    with PLOT_LOCK:
+        if not os.path.exists(npz_path):
+            return
+        with np.load(npz_path) as data:
+            arrays = {key: data[key] for key in data.files}
+        with open(stats_path, encoding="utf-8") as f:
+            stats = json.load(f)
+        save_analysis_results(out_dir, **arrays, **stats)
+        os.remove(npz_path)
+        os.remove(stats_path)
+
 def save_analysis_results(out_dir, img, mask_pore, im_thick, 
                          diam_center_nm, diam_width_nm, diam_pdf,
                          avg_diam_nm, mode_diam_nm, nm_per_px, 
@@ -341,19 +512,17 @@ def save_analysis_results(out_dir, img, mask_pore, im_thick,
         f.write(f"平均直径: {avg_diam_nm:.3f} nm\n")
         f.write(f"最頻直径: {mode_diam_nm:.3f} nm\n\n")
         f.write("直径中心(nm)\t幅(nm)\tPDF\n")
-        for c, w_, p in zip(diam_center_nm, diam_width_nm, diam_pdf):
-            f.write(f"{c:.3f}\t{w_:.3f}\t{p:.6f}\n")
+        np.savetxt(f, np.column_stack([diam_center_nm, diam_width_nm, diam_pdf]),
+                   fmt=['%.3f', '%.3f', '%.6f'], delimiter='\t')
     
     # Histogram plot with Japanese labels
     plt.figure(figsize=(12, 8))
-    plt.rcParams['font.family'] = ['DejaVu Sans', 'Arial Unicode MS', 'sans-serif']
     plt.bar(diam_center_nm, diam_pdf, width=diam_width_nm, 
             edgecolor="k", alpha=0.7, color='steelblue')
     plt.xlabel("細孔直径 (nm)", fontsize=12)
     plt.ylabel("確率密度", fontsize=12)
     plt.title(f"細孔サイズ分布\n平均: {avg_diam_nm:.1f}nm, 最頻: {mode_diam_nm:.1f}nm", fontsize=14)
     plt.grid(True, alpha=0.3)
-    plt.tight_layout()
     plt.savefig(os.path.join(out_dir, "pore_size_distribution.png"), dpi=300, bbox_inches='tight')
     plt.close()
     
@@ -361,8 +530,8 @@ def save_analysis_results(out_dir, img, mask_pore, im_thick,
     raw_path = os.path.join(out_dir, "raw_histogram_data.csv")
     with open(raw_path, "w", encoding="utf-8") as f:
         f.write("直径中心(nm),PDF\n")
-        for c, p in zip(diam_center_nm, diam_pdf):
-            f.write(f"{c:.3f},{p:.6f}\n")
+        np.savetxt(f, np.column_stack([diam_center_nm, diam_pdf]),
+                   fmt=['%.3f', '%.6f'], delimiter=',')
         f.write(f"\n# 統計情報\n")
         f.write(f"# 平均直径: {avg_diam_nm:.3f} nm\n")
         f.write(f"# 最頻直径: {mode_diam_nm:.3f} nm\n")
@@ -370,8 +539,7 @@ def save_analysis_results(out_dir, img, mask_pore, im_thick,
         f.write(f"# 検出細孔数: {total_pores}\n")
     
     # Save diagnostic images
-    skimage.io.imsave(os.path.join(out_dir, "original_image.png"), 
-                     (img * 255).astype(np.uint8))
+    skimage.io.imsave(os.path.join(out_dir, "original_image.png"), img)
     skimage.io.imsave(os.path.join(out_dir, "thresholded_image.png"),
                      (mask_pore.astype(np.uint8) * 255))
     
@@ -381,35 +549,40 @@ def save_analysis_results(out_dir, img, mask_pore, im_thick,
     plt.colorbar(label="細孔サイズ (nm)")
     plt.title("細孔サイズマップ")
     plt.axis('off')
-    plt.tight_layout()
     plt.savefig(os.path.join(out_dir, "pore_size_map.png"), dpi=300, bbox_inches='tight')
     plt.close()
 
+def iter_results_zip(analysis_dir, chunk_size=1 << 16):
+    """Build an uncompressed zip of analysis_dir in memory and yield it in chunks"""
+    buffered = io.BytesIO()
+    with zipfile.ZipFile(buffered, 'w', zipfile.ZIP_STORED) as zipf:
+        for root, dirs, files in os.walk(analysis_dir):
+            for file in files:
+                file_path = os.path.join(root, file)
+                zipf.write(file_path, os.path.relpath(file_path, analysis_dir))
+    buffered.seek(0)
+    yield from iter(lambda: buffered.read(chunk_size), b"")
+
 @app.get("/api/download/{output_dir}")
 async def download_results(output_dir: str):
     """Create and return a zip file with all results"""
     try:
-        if output_dir not in analysis_results:
+        await remove_temp_dirs(prune_analysis_results())
+        analysis_dir = lookup_analysis_result(output_dir)
+        if analysis_dir is None:
             raise HTTPException(status_code=404, detail="結果が見つかりません")
         
-        analysis_dir = analysis_results[output_dir]
-        
         if not os.path.exists(analysis_dir):
             raise HTTPException(status_code=404, detail="結果ディレクトリが見つかりません")
         
-        # Create zip file
-        zip_path = os.path.join(os.path.dirname(analysis_dir), f"poromet_results_{output_dir}.zip")
-        with zipfile.ZipFile(zip_path, 'w') as zipf:
-            for root, dirs, files in os.walk(analysis_dir):
-                for file in files:
-                    file_path = os.path.join(root, file)
-                    arcname = os.path.relpath(file_path, analysis_dir)
-                    zipf.write(file_path, arcname)
+        # Render report files on first download
+        await asyncio.get_running_loop().run_in_executor(None, render_analysis_results, analysis_dir)
         
-        return FileResponse(
-            zip_path,
+        # Stream the zip from memory; PNGs are already compressed, so store without deflate
+        return StreamingResponse(
+            iter_results_zip(analysis_dir),
             media_type="application/zip",
-            filename=f"poromet_results_{output_dir}.zip"
+            headers={"Content-Disposition": f'attachment; filename="poromet_results_{output_dir}.zip"'}
         )
         
     except HTTPException:
@@ -425,14 +598,8 @@ if __name__ == "__main__":
     print(f"サーバーURL: http://127.0.0.1:8000")
     print(f"ヘルスチェック: http://127.0.0.1:8000/api/health")
     print(f"API ドキュメント: http://127.0.0.1:8000/docs")
-    print(f"PoreSpy 利用可能: {PORESPY_AVAILABLE}")
     print("=" * 60)
     
-    if not PORESPY_AVAILABLE:
-        print("⚠️  警告: porespy がインストールされていません")
-        print("   自動インストールを試行中...")
-        print("=" * 60)
-    
     try:
         uvicorn.run(app, host="127.0.0.1", port=8000, log_level="info")
     except ImportError as e:
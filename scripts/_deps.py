@@ -0,0 +1,170 @@
+"""
+Shared dependency definitions for the Poromet launcher scripts
+依存パッケージの一覧と pip 関連の共通処理
+"""
+
+import hashlib
+import json
+import re
+import subprocess
+import sys
+import time
+import importlib.util
+from importlib import metadata
+from pathlib import Path
+
+# (pip パッケージ名, import 名)
+PACKAGES = (
+    ("fastapi", "fastapi"),
+    ("uvicorn[standard]", "uvicorn"),
+    ("python-multipart", "multipart"),
+    ("numpy", "numpy"),
+    ("matplotlib", "matplotlib"),
+    ("scikit-image", "skimage"),
+    ("pillow", "PIL"),
+    ("porespy", "porespy"),
+)
+
+# wheel が常に提供される純 Python パッケージ (wheel 限定で失敗してもソースビルドで再試行しない)
+PURE_PYTHON_PACKAGES = frozenset({"fastapi", "python-multipart"})
+
+# pip のダウンロードキャッシュ (再実行時はネットワークではなくディスクから取得)
+PIP_CACHE_DIR = Path.home() / ".cache" / "poromet" / "pip"
+
+# pip 操作のパッケージ1つあたりの上限 (porespy は scipy/numba を取得するため時間がかかる)
+PIP_TIMEOUT_SEC = 600
+
+# pip のアップグレードは一定期間に1回だけ行う
+PIP_UPGRADE_MARKER = PIP_CACHE_DIR / ".upgraded"
+PIP_UPGRADE_INTERVAL_SEC = 7 * 24 * 60 * 60
+
+def pip_upgrade_due():
+    """前回の pip アップグレードから PIP_UPGRADE_INTERVAL_SEC 以上経過しているか"""
+    try:
+        return time.time() - PIP_UPGRADE_MARKER.stat().st_mtime >= PIP_UPGRADE_INTERVAL_SEC
+    except FileNotFoundError:
+        return True
+
+def mark_pip_upgraded():
+    """pip アップグレードの実行時刻を記録"""
+    PIP_UPGRADE_MARKER.parent.mkdir(parents=True, exist_ok=True)
+    PIP_UPGRADE_MARKER.touch()
+
+# 依存関係チェックに成功した環境の記録 (一致すれば次回以降の確認を省略)
+DEPS_MARKER = Path.home() / ".cache" / "poromet" / "deps_ok.json"
+
+def deps_fingerprint():
+    """現在のインタプリタとパッケージ一覧を識別する値"""
+    return {"py": sys.executable, "pkgs": hashlib.md5(repr(PACKAGES).encode()).hexdigest()}
+
+def deps_marked_ok():
+    """前回の確認結果が現在の環境と一致するか"""
+    try:
+        return json.loads(DEPS_MARKER.read_text()) == deps_fingerprint()
+    except (OSError, ValueError):
+        return False
+
+def mark_deps_ok():
+    """依存関係がそろっていることを記録"""
+    DEPS_MARKER.parent.mkdir(parents=True, exist_ok=True)
+    DEPS_MARKER.write_text(json.dumps(deps_fingerprint()))
+
+def clear_deps_mark():
+    """依存関係の確認結果を破棄 (次回の起動で再確認させる)"""
+    try:
+        DEPS_MARKER.unlink()
+    except FileNotFoundError:
+        pass
+
+# 初回の完全インストール後に pip freeze した結果 (以降は依存解決を省略して再利用)
+LOCK_FILE = Path.home() / ".cache" / "poromet" / "lock.txt"
+
+def lock_header():
+    """ロックファイル先頭のコメント行 (作成時の環境と書式を識別する)"""
+    return "# poromet lock v2 " + json.dumps(deps_fingerprint(), sort_keys=True)
+
+def lock_valid():
+    """現在の環境で作成されたロックファイルがあるか"""
+    try:
+        with LOCK_FILE.open() as f:
+            return f.readline().rstrip("\n") == lock_header()
+    except OSError:
+        return False
+
+# 要求文字列 / pip freeze の行の先頭にあるパッケージ名と extras
+REQUIREMENT_NAME = re.compile(r"\s*([A-Za-z0-9][A-Za-z0-9._-]*)(?:\s*\[([^\]]*)\])?")
+# 依存を特定の extra に限定する environment marker
+EXTRA_MARKER = re.compile(r"""extra\s*==\s*['"]([^'"]+)['"]""")
+
+def normalize_name(name):
+    """パッケージ名を比較用に正規化 (PEP 503)"""
+    return re.sub(r"[-_.]+", "-", name).lower()
+
+def parse_requirement(requirement):
+    """要求文字列を (正規化名, extras の集合) に分解"""
+    match = REQUIREMENT_NAME.match(requirement)
+    extras = match.group(2) or ""
+    return normalize_name(match.group(1)), frozenset(normalize_name(e) for e in extras.split(",") if e.strip())
+
+def dependency_closure(packages=PACKAGES):
+    """PACKAGES とそのインストール済みの依存パッケージ (推移的) の正規化名の集合
+
+    extra の条件は要求された extras に限って辿り、それ以外の environment marker は評価せずに含める
+    """
+    pending = [parse_requirement(package) for package, _ in packages]
+    seen = set()
+    while pending:
+        name, extras = pending.pop()
+        if (name, extras) in seen:
+            continue
+        seen.add((name, extras))
+        try:
+            requires = metadata.distribution(name).requires or []
+        except metadata.PackageNotFoundError:
+            continue
+        for requirement in requires:
+            requirement, _, marker = requirement.partition(";")
+            extra = EXTRA_MARKER.search(marker)
+            if extra is None or normalize_name(extra.group(1)) in extras:
+                pending.append(parse_requirement(requirement))
+    return {name for name, _ in seen}
+
+def write_lock():
+    """PACKAGES とその依存パッケージのバージョンをロックファイルに記録
+
+    無関係なパッケージ (例えば pkg @ file://... の行) が混ざると以降のロックインストールが失敗するため除外する
+    """
+    result = subprocess.run(
+        [sys.executable, "-m", "pip", "freeze", "--exclude-editable"],
+        capture_output=True, text=True
+    )
+    if result.returncode != 0:
+        return False
+    names = dependency_closure()
+    pinned = [
+        line for line in result.stdout.splitlines()
+        if REQUIREMENT_NAME.match(line) and parse_requirement(line)[0] in names
+    ]
+    LOCK_FILE.parent.mkdir(parents=True, exist_ok=True)
+    LOCK_FILE.write_text("\n".join([lock_header(), *pinned]) + "\n")
+    return True
+
+def is_installed(import_name):
+    """パッケージがインポート可能かチェック (モジュール自体は読み込まない)"""
+    return importlib.util.find_spec(import_name) is not None
+
+def check_packages(packages=PACKAGES):
+    """各パッケージの (pip パッケージ名, 利用可能か) を元の順序で返す"""
+    return [(package, is_installed(import_name)) for package, import_name in packages]
+
+def pip_install_argv(*packages, binary_only=False):
+    """キャッシュを使う pip install のコマンドライン (binary_only=True で wheel のみ)"""
+    only_binary = ["--only-binary=:all:"] if binary_only else []
+    return [
+        sys.executable, "-m", "pip", "install",
+        "--cache-dir", str(PIP_CACHE_DIR), "--prefer-binary", *only_binary, *packages
+    ]
+
+def source_fallback_allowed(*packages):
+    """wheel 限定のインストールに失敗したとき、ソースからのビルドを試す価値があるか"""
+    return any(package not in PURE_PYTHON_PACKAGES for package in packages)
@@ -0,0 +1,362 @@
+#!/usr/bin/env python3
+"""
+Poromet launcher
+依存関係のインストールとバックエンドサーバーの起動をまとめたコマンド
+
+    python scripts/poromet.py install   # 依存関係を一括インストール
+    python scripts/poromet.py start     # 依存関係を確認せずにサーバーを起動
+    python scripts/poromet.py auto      # 依存関係を確認・インストールしてから起動
+"""
+
+import argparse
+import subprocess
+import sys
+import os
+import importlib.util
+import sysconfig
+from pathlib import Path
+
+from _deps import (
+    PACKAGES, PIP_CACHE_DIR, PIP_TIMEOUT_SEC, check_packages, pip_install_argv,
+    pip_upgrade_due, mark_pip_upgraded, deps_marked_ok, mark_deps_ok, clear_deps_mark,
+    LOCK_FILE, lock_valid, write_lock, source_fallback_allowed,
+)
+
+# server.py の候補 (server.py は作業ディレクトリに依存しないので移動はしない)
+SERVER_CANDIDATES = [
+    Path("backend/server.py"),
+    Path("server.py"),
+    Path("../backend/server.py"),
+    Path(__file__).resolve().parent.parent / "backend" / "server.py",
+]
+
+def find_server_file():
+    """server.pyファイルを探し、絶対パスを返す"""
+    server_path = next((path for path in SERVER_CANDIDATES if path.is_file()), None)
+    return server_path.resolve() if server_path is not None else None
+
+# run_command の出力の代わりに返す値 (タイムアウトを他の失敗と区別する)
+COMMAND_TIMEOUT = "Timeout"
+
+def run_command(argv, description="", timeout=30, capture=True):
+    """コマンド (引数リスト) をシェルを介さずに実行し、結果を返す
+
+    capture=False の場合は出力をそのまま端末に流し、結果は終了コードのみで判定する
+    タイムアウトした場合は (False, COMMAND_TIMEOUT) を返す
+    """
+    try:
+        print(f"🔄 {description}...")
+        if not capture:
+            result = subprocess.run(argv, timeout=timeout, check=False)
+            if result.returncode == 0:
+                print(f"✅ {description} 成功")
+                return True, ""
+            print(f"❌ {description} 失敗 (終了コード {result.returncode})")
+            return False, ""
+        result = subprocess.run(argv, capture_output=True, text=True, timeout=timeout)
+        if result.returncode == 0:
+            print(f"✅ {description} 成功")
+            return True, result.stdout
+        else:
+            print(f"❌ {description} 失敗: {result.stderr}")
+            return False, result.stderr
+    except subprocess.TimeoutExpired:
+        print(f"⏰ {description} タイムアウト")
+        return False, COMMAND_TIMEOUT
+    except Exception as e:
+        print(f"❌ {description} エラー: {e}")
+        return False, str(e)
+
+def check_python():
+    """Python環境をチェック"""
+    print("🐍 Python環境をチェック中...")
+    
+    # Python version check
+    version = sys.version_info
+    print(f"Python バージョン: {version.major}.{version.minor}.{version.micro}")
+    
+    if version < (3, 8):
+        print("❌ Python 3.8以上が必要です")
+        return False
+    
+    print("✅ Python バージョンOK")
+    return True
+
+def install_from_lock():
+    """ロックファイルの固定バージョンを依存解決なし (--no-deps) でインストール (pip の出力はそのまま端末に流す)"""
+    argv = pip_install_argv("--disable-pip-version-check", "--no-deps", "-r", str(LOCK_FILE))
+    success, _ = run_command(
+        argv, "ロックファイルからインストール (依存解決を省略)",
+        timeout=PIP_TIMEOUT_SEC * len(PACKAGES), capture=False
+    )
+    if success:
+        return True
+    print("⚠️ ロックファイルからのインストールに失敗したため、通常のインストールを行います")
+    return False
+
+def cmd_install():
+    """必要な依存関係を一括インストール"""
+    print("📦 Poromet 依存関係インストーラー")
+    print("=" * 40)
+    
+    PIP_CACHE_DIR.mkdir(parents=True, exist_ok=True)
+    
+    packages = [package for package, _ in PACKAGES]
+    
+    # Emit the package list in one write rather than one print per line
+    listing = "\n".join(f"  - {pkg}" for pkg in packages)
+    sys.stdout.write(f"インストール対象: {len(packages)}個のパッケージ\n{listing}\n")
+    sys.stdout.flush()
+    
+    print("\n🔄 インストール開始...")
+    
+    # Upgrade pip first (skipped if done recently)
+    if pip_upgrade_due():
+        try:
+            subprocess.check_call([
+                sys.executable, "-m", "pip", "install", "--cache-dir", str(PIP_CACHE_DIR), "--upgrade", "pip"
+            ])
+            mark_pip_upgraded()
+            print("✅ pip をアップグレードしました")
+        except:
+            print("⚠️ pip のアップグレードに失敗しましたが、続行します")
+    
+    failed_packages = []
+    
+    # Reuse the versions resolved on a previous full install when available
+    if not (lock_valid() and install_from_lock()):
+        # A single pip process streaming to the terminal: concurrent pip runs race on
+        # the same site-packages and would interleave their progress output
+        print(f"\n📥 {len(packages)}個のパッケージをインストール中...")
+        if not install_many(packages):
+            # pip does not say which requirement failed, so probe what is still missing
+            importlib.invalidate_caches()
+            failed_packages = [package for package, ok in check_packages(PACKAGES) if not ok] or packages
+    
+        # Record the resolved versions so the next run can skip the resolver
+        if not failed_packages:
+            write_lock()
+    
+    # Summary
+    print("\n" + "=" * 40)
+    if failed_packages:
+        print(f"❌ {len(failed_packages)}個のパッケージでエラー:")
+        for pkg in failed_packages:
+            print(f"  - {pkg}")
+        print("\n🔧 手動インストールを試してください:")
+        for pkg in failed_packages:
+            print(f"pip install {pkg}")
+        return False
+    else:
+        mark_deps_ok()
+        print("✅ すべての依存関係のインストールが完了しました！")
+        print("\n🚀 次のステップ:")
+        print("python scripts/poromet.py start")
+        return True
+
+def cmd_start():
+    """依存関係を確認せずにサーバーを直接起動"""
+    print("🚀 Poromet サーバー直接起動")
+    print("=" * 30)
+    
+    # Find server file
+    server_path = find_server_file()
+    if server_path is None:
+        print("❌ server.py が見つかりません")
+        return False
+    
+    print(f"📁 サーバーファイル: {server_path}")
+    
+    # Replace this process with the server instead of keeping a parent interpreter around,
+    # so flush the banner (written in one go) before exec discards the buffer
+    sys.stdout.write(f"🔥 サーバー起動中...\nURL: http://127.0.0.1:8000\nCtrl+C で停止\n{'-' * 30}\n")
+    sys.stdout.flush()
+    argv = [sys.executable, str(server_path)]
+    try:
+        if os.name == "nt":
+            # Windows emulates exec by spawning a new process and exiting, which
+            # detaches the server from the console; wait on it as a child instead
+            sys.exit(subprocess.call(argv))
+        os.execv(sys.executable, argv)
+    except OSError as e:
+        print(f"❌ エラー: {e}")
+        return False
+
+def install_many(packages):
+    """不足パッケージを1回の pip 呼び出しでまとめてインストール (pip の出力はそのまま端末に流す)"""
+    PIP_CACHE_DIR.mkdir(parents=True, exist_ok=True)
+    # pip's output is not captured, so decide on a user install up front
+    # instead of retrying after a "Permission denied" failure
+    user = ["--user"] if not os.access(sysconfig.get_paths()["purelib"], os.W_OK) else []
+    
+    description = f"Installing {' '.join(packages)}"
+    # The whole batch runs in one pip process, so the cap grows with its size
+    timeout = PIP_TIMEOUT_SEC * len(packages)
+    
+    # Wheels only first; a source build of the scientific stack takes minutes
+    argv = pip_install_argv(*user, *packages, binary_only=True)
+    success, output = run_command(argv, description, timeout=timeout, capture=False)
+    # A timed-out download will not get faster by building the same packages from source
+    if success or output == COMMAND_TIMEOUT or not source_fallback_allowed(*packages):
+        return success
+    
+    argv = pip_install_argv(*user, *packages)
+    success, _ = run_command(argv, f"{description} (source)", timeout=timeout, capture=False)
+    return success
+
+def check_and_install_dependencies():
+    """依存関係をチェックしてインストール"""
+    print("\n📦 依存関係をチェック中...")
+    
+    # Skip probing when a previous run already verified this interpreter
+    if deps_marked_ok():
+        print("✅ 前回の確認結果を使用します (依存関係はインストール済み)")
+        return True
+    
+    missing_packages = []
+    
+    for package_name, ok in check_packages(PACKAGES):
+        if ok:
+            print(f"✅ {package_name}")
+        else:
+            print(f"❌ {package_name} (インストールが必要)")
+            missing_packages.append(package_name)
+    
+    if missing_packages:
+        print(f"\n📥 {len(missing_packages)}個のパッケージをインストール中...")
+    
+        # Try to upgrade pip first (skipped if done recently)
+        if pip_upgrade_due():
+            success, _ = run_command(
+                [sys.executable, "-m", "pip", "install", "--upgrade", "pip"], "pip upgrade",
+                timeout=PIP_TIMEOUT_SEC, capture=False
+            )
+            if success:
+                mark_pip_upgraded()
+    
+        # A single pip process: the resolver and index fetches are shared across the batch
+        if not install_many(missing_packages):
+            print("❌ パッケージのインストールに失敗しました")
+            return False
+    
+        print("\n✅ すべての依存関係がインストールされました！")
+    else:
+        print("\n✅ すべての依存関係が利用可能です！")
+    
+    mark_deps_ok()
+    return True
+
+def start_server():
+    """サーバーをこのプロセス内で起動"""
+    print("\n🚀 Porometバックエンドサーバーを起動中...")
+    
+    server_path = find_server_file()
+    if server_path is None:
+        print("❌ server.py が見つかりません")
+        print("以下の場所を確認してください:")
+        for path in SERVER_CANDIDATES:
+            print(f"  - {path}")
+        return False
+    
+    print(f"📁 サーバーファイル: {server_path}")
+    
+    rule = "=" * 50
+    sys.stdout.write(f"""🔥 サーバー起動中...
+{rule}
+サーバーURL: http://127.0.0.1:8000
+ヘルスチェック: http://127.0.0.1:8000/api/health
+API ドキュメント: http://127.0.0.1:8000/docs
+停止するには Ctrl+C を押してください
+{rule}
+""")
+    sys.stdout.flush()
+    
+    try:
+        # Import and run the server
+        spec = importlib.util.spec_from_file_location("server", str(server_path))
+        server_module = importlib.util.module_from_spec(spec)
+        # Register before executing so a nested `import server` reuses this module
+        sys.modules["server"] = server_module
+        spec.loader.exec_module(server_module)
+    
+        # exec_module does not run the `__main__` block, so start uvicorn here
+        import uvicorn
+        uvicorn.run(server_module.app, host="127.0.0.1", port=8000, log_level="info")
+        return True
+    
+    except KeyboardInterrupt:
+        print("\n\n🛑 サーバーが停止されました")
+        return True
+    except ImportError as e:
+        # A package was removed after the last successful check; probe again on the next run
+        clear_deps_mark()
+        print(f"\n❌ 依存関係エラー: {e}")
+        print("依存関係の確認結果をリセットしました。もう一度実行すると再確認・インストールします")
+        return False
+    except Exception as e:
+        print(f"\n❌ サーバー起動エラー: {e}")
+        return False
+
+def cmd_auto():
+    """システムをチェックし、依存関係をインストールしてサーバーを起動"""
+    print("🚀 Poromet Backend Auto Starter")
+    print("=" * 50)
+    # os.uname is enough for the banner; the platform module is not worth importing here
+    if hasattr(os, "uname"):
+        uname = os.uname()
+        os_name, machine = f"{uname.sysname} {uname.release}", uname.machine
+    else:  # Windows
+        os_name, machine = sys.platform, os.environ.get("PROCESSOR_ARCHITECTURE", "unknown")
+    print(f"OS: {os_name}")
+    print(f"アーキテクチャ: {machine}")
+    
+    # Step 1: Check Python
+    if not check_python():
+        print("\n❌ Python環境に問題があります")
+        return False
+    
+    # Step 2: Install dependencies
+    if not check_and_install_dependencies():
+        print("\n❌ 依存関係のインストールに失敗しました")
+        return False
+    
+    # Step 3: Start server
+    if not start_server():
+        print("\n❌ サーバーの起動に失敗しました")
+        return False
+    
+    return True
+
+COMMANDS = {
+    "install": cmd_install,
+    "start": cmd_start,
+    "auto": cmd_auto,
+}
+
+def main(argv=None):
+    """コマンドラインを解釈してサブコマンドを実行し、終了コードを返す"""
+    parser = argparse.ArgumentParser(prog="poromet", description="Poromet backend launcher")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    for name, func in COMMANDS.items():
+        subparsers.add_parser(name, help=func.__doc__)
+    args = parser.parse_args(argv)
+    
+    try:
+        success = COMMANDS[args.command]()
+    except KeyboardInterrupt:
+        print("\n\n👋 終了しました")
+        return 0
+    except Exception as e:
+        print(f"\n❌ 予期しないエラー: {e}")
+        return 1
+    
+    if not success:
+        if args.command == "auto":
+            print("\n🔧 手動でのインストールを試してください:")
+            print("pip install fastapi uvicorn python-multipart porespy numpy matplotlib scikit-image pillow")
+            print("python backend/server.py")
+        return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())